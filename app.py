@@ -12,11 +12,13 @@ from dash.dependencies import Input, Output, State
 
 # graphing
 import plotly.express as px
+import plotly.graph_objects as go
 
 # data frames
 import pandas as pd
 
 # my modules
+import data_view
 import mpt
 import uts
 
@@ -250,6 +252,8 @@ def update_portfolio(est_start, est_end, eval_start, eval_end, stocks, risk_free
         fig_sharpe = px.line(df_all_data, x='days', y='Sharpe', color='strategy', hover_name='strategy',
                              title='Sharpe Ratio ~ Days')
 
+        cloud = get_portfolio_cloud(est_data, stocks, est_start, est_end)
+
         tmp_div = html.Div([
             html.Hr(),
             dcc.Graph(figure=fig_return),
@@ -257,6 +261,8 @@ def update_portfolio(est_start, est_end, eval_start, eval_end, stocks, risk_free
             dcc.Graph(figure=fig_risk),
             html.Br(),
             dcc.Graph(figure=fig_sharpe),
+            html.Br(),
+            dcc.Graph(figure=get_cloud_figure(cloud, risk_free)),
             html.Br()
         ])
 
@@ -265,6 +271,42 @@ def update_portfolio(est_start, est_end, eval_start, eval_end, stocks, risk_free
         return html.Div([html.Br()])
 
 
+def get_portfolio_cloud(est_data, stocks, est_start, est_end):
+
+    # the cloud depends on the estimation window only, so changing the risk-free rate reuses it
+    key = (tuple(stocks), est_start, est_end)
+    if data_set.get('cloud_key') != key:
+        try:
+            data_set['cloud'] = mpt.simulate_portfolios(est_data.mean(), est_data.cov(), len(est_data.index), seed=0)
+        except ValueError:
+            data_set['cloud'] = None
+        data_set['cloud_key'] = key
+
+    return data_set['cloud']
+
+
+def get_cloud_figure(cloud, risk_free):
+
+    if cloud is None:
+        return uts.empty_plot_layout
+
+    df_frontier, best = mpt.get_frontier_results(cloud, risk_free)
+    w_best = cloud['weights'].loc[best]
+
+    fig_cloud = go.Figure(go.Heatmap(z=cloud['density'].values, x=cloud['density'].columns,
+                                     y=cloud['density'].index, colorscale='Blues', name='portfolios'))
+    fig_cloud.add_trace(go.Scatter(x=df_frontier['Risk'], y=df_frontier['ExpReturn'],
+                                   customdata=df_frontier['Sharpe'], mode='lines', name='frontier',
+                                   hovertemplate='Sharpe: %{customdata:.3f}'))
+    fig_cloud.add_trace(go.Scatter(x=[df_frontier['Risk'][best]], y=[df_frontier['ExpReturn'][best]],
+                                   mode='markers', marker={'size': 12, 'symbol': 'star'}, name='max Sharpe',
+                                   hovertext=', '.join([ticker + ': ' + '{:.1%}'.format(weight)
+                                                        for ticker, weight in w_best.items()])))
+    fig_cloud.update_layout(title='Random Portfolios (Return ~ Risk)', xaxis_title='Risk', yaxis_title='ExpReturn')
+
+    return fig_cloud
+
+
 # data view page
 def render_data_view_tab():
     return html.Div([
@@ -278,9 +320,19 @@ def render_data_view_tab():
         ], style={'margin': 'auto', 'width': '60%'}),
 
         html.Hr(),
-        html.Div(['Current Data (Preview)'], style=uts.up_style_2),
+        html.Div(['Current Data'], style=uts.up_style_2),
+        html.Br(),
+        dcc.Dropdown(
+            id='data-view-columns',
+            options=data_set['tickers'],
+            value=[ticker['value'] for ticker in data_set['tickers'][:8]],
+            multi=True,
+            style={'margin': 'auto', 'width': '60%'},
+            placeholder='Select columns to view'
+        ),
         html.Br(),
-        get_data_view_table(data_set['df']),
+        get_data_view_table(),
+        html.Div(id='data-view-filter-note', style=uts.up_style_5),
         html.Br(),
         html.Div([
             html.Button('Validate Data', id='validate-button', n_clicks=0),
@@ -290,24 +342,69 @@ def render_data_view_tab():
     ], style=uts.box_style)
 
 
-def get_data_view_table(df: pd.DataFrame):
-
-    df_2 = df.copy()
-    df_2 = df_2[df_2.columns[:8]]
-    df_2 = df_2[:10]
-    df_2['date'] = df_2.index
-    columns = df_2.columns.to_list()
-    columns = columns[-1:] + columns[:-1]
-    df_2 = df_2[columns]
-
+def get_data_view_table():
     return dash_table.DataTable(
-        columns=[{'name': i, 'id': i} for i in df_2.columns],
-        data=df_2.to_dict('records'),
+        id='data-view-table',
+        page_action='custom',
+        page_current=0,
+        page_size=10,
+        sort_action='custom',
+        sort_mode='multi',
+        sort_by=[],
+        filter_action='custom',
+        filter_query='',
         style_cell={'textAlign': 'center'},
         style_table=uts.up_style_3
     )
 
 
+@app.callback(Output('data-view-table', 'columns'),
+              Output('data-view-table', 'data'),
+              Output('data-view-table', 'page_count'),
+              Output('data-view-filter-note', 'children'),
+              Input('data-view-columns', 'value'),
+              Input('data-view-table', 'page_current'),
+              Input('data-view-table', 'page_size'),
+              Input('data-view-table', 'sort_by'),
+              Input('data-view-table', 'filter_query'))
+def update_data_view_table(columns, page_current, page_size, sort_by, filter_query):
+
+    # a new query or column selection is served from the first page, reset_data_view_page syncs the pager
+    triggers = [trigger['prop_id'] for trigger in dash.callback_context.triggered]
+    if 'data-view-table.page_current' not in triggers:
+        page_current = 0
+
+    columns = columns or []
+    positions, ignored = get_data_view_positions(filter_query, sort_by)
+    data, page_count = data_view.get_view_page(data_set['df'], columns, positions, page_current, page_size)
+
+    note = 'Filter not applied: ' + ', '.join(ignored) if ignored else ''
+
+    return data_view.get_view_columns(data_set['df'], columns), data, page_count, note
+
+
+@app.callback(Output('data-view-table', 'page_current'),
+              Input('data-view-columns', 'value'),
+              Input('data-view-table', 'sort_by'),
+              Input('data-view-table', 'filter_query'))
+def reset_data_view_page(columns, sort_by, filter_query):
+    return 0
+
+
+def get_data_view_positions(filter_query, sort_by):
+
+    # filtering and sorting scan the data set once, paging through the result reuses it
+    if not filter_query and not sort_by:
+        return None, []
+
+    key = (filter_query, str(sort_by))
+    if data_set.get('view_key') != key:
+        data_set['view_positions'] = data_view.get_view_positions(data_set['df'], filter_query, sort_by)
+        data_set['view_key'] = key
+
+    return data_set['view_positions']
+
+
 @app.callback(Output('validation-output', 'children'),
               Input('validate-button', 'n_clicks'))
 def update_data_view_tab(n_clicks):
@@ -0,0 +1,154 @@
+import operator
+
+import numpy as np
+import pandas as pd
+
+
+# DataTable filter syntax
+
+filter_operators = [['ge ', '>='], ['le ', '<='], ['lt ', '<'], ['gt ', '>'], ['ne ', '!='], ['eq ', '='],
+                    ['contains '], ['datestartswith '], ['is blank'], ['is bool'], ['is even'], ['is nil'],
+                    ['is num'], ['is object'], ['is odd'], ['is prime'], ['is str']]
+
+comparison_functions = {
+    'ge': operator.ge,
+    'le': operator.le,
+    'lt': operator.lt,
+    'gt': operator.gt,
+    'ne': operator.ne,
+    'eq': operator.eq
+}
+
+
+def is_number(value):
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)) \
+        and not pd.isna(value)
+
+
+def is_prime(value):
+    if not is_number(value) or value != int(value) or value < 2:
+        return False
+    return all(int(value) % divisor for divisor in range(2, int(value ** 0.5) + 1))
+
+
+unary_functions = {
+    'is blank': lambda series: series.isna() | series.astype(str).str.strip().eq(''),
+    'is bool': lambda series: series.map(lambda value: isinstance(value, (bool, np.bool_))),
+    'is even': lambda series: series.map(lambda value: is_number(value) and value % 2 == 0),
+    'is nil': lambda series: series.isna(),
+    'is num': lambda series: series.map(is_number),
+    'is object': lambda series: series.map(lambda value: isinstance(value, (dict, list))),
+    'is odd': lambda series: series.map(lambda value: is_number(value) and value % 2 == 1),
+    'is prime': lambda series: series.map(is_prime),
+    'is str': lambda series: series.map(lambda value: isinstance(value, str))
+}
+
+
+def get_index_id(df: pd.DataFrame):
+
+    # the index gets a column id of its own, so a data column called 'date' is never shadowed
+    index_id = '_index'
+    while index_id in df.columns:
+        index_id = '_' + index_id
+    return index_id
+
+
+def get_index_name(df: pd.DataFrame):
+    return df.index.name or 'date'
+
+
+def split_filter_part(filter_part: str):
+
+    # the column name is read up to its closing brace, so operator symbols inside it are never matched
+    filter_part = filter_part.strip()
+    if not filter_part.startswith('{') or '}' not in filter_part:
+        return [None] * 3
+
+    name = filter_part[1: filter_part.index('}')]
+    rest = filter_part[filter_part.index('}') + 1:].strip() + ' '
+
+    for operator_type in filter_operators:
+        for symbol in operator_type:
+            if rest.startswith(symbol):
+                value_part = rest[len(symbol):].strip()
+                quote = value_part[:1]
+                if len(value_part) > 1 and quote == value_part[-1:] and quote in ('\'', '"', '`'):
+                    value_part = value_part[1: -1].replace('\\' + quote, quote)
+
+                return name, operator_type[0].strip(), value_part
+
+    return [None] * 3
+
+
+def get_column_values(df: pd.DataFrame, column: str):
+    if column == get_index_id(df):
+        return df.index.values
+    return df[column].values
+
+
+def convert_filter_value(df: pd.DataFrame, column: str, value: str):
+    if column != get_index_id(df) and pd.api.types.is_numeric_dtype(df[column]):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return value
+
+
+def get_view_positions(df: pd.DataFrame, filter_query: str, sort_by: list):
+
+    mask = np.ones(len(df.index), dtype=bool)
+    ignored = []
+
+    for filter_part in filter_query.split(' && ') if filter_query else []:
+        name, operation, value = split_filter_part(filter_part)
+
+        # parts that cannot be applied are reported back instead of silently matching everything
+        if name is None or (name != get_index_id(df) and name not in df.columns) or \
+                (operation in unary_functions and value):
+            ignored.append(filter_part)
+            continue
+
+        values = get_column_values(df, name)
+        if operation in comparison_functions:
+            # a value that does not fit the column type matches nothing
+            value = convert_filter_value(df, name, value)
+            try:
+                matched = value is not None and np.asarray(comparison_functions[operation](values, value), dtype=bool)
+            except TypeError:
+                matched = False
+            mask &= matched
+        elif operation in unary_functions:
+            mask &= np.asarray(unary_functions[operation](pd.Series(values)), dtype=bool)
+        elif operation == 'contains':
+            mask &= pd.Series(values).astype(str).str.contains(value, regex=False).values
+        elif operation == 'datestartswith':
+            mask &= pd.Series(values).astype(str).str.startswith(value).values
+
+    positions = np.flatnonzero(mask)
+
+    if sort_by:
+        keys = pd.DataFrame({sort['column_id']: get_column_values(df, sort['column_id'])[positions]
+                             for sort in sort_by})
+        keys = keys.sort_values([sort['column_id'] for sort in sort_by],
+                                ascending=[sort['direction'] == 'asc' for sort in sort_by], kind='mergesort')
+        positions = positions[keys.index.values]
+
+    return positions, ignored
+
+
+def get_view_columns(df: pd.DataFrame, columns: list):
+    return [{'name': get_index_name(df), 'id': get_index_id(df)}] + [{'name': i, 'id': i} for i in columns]
+
+
+def get_view_page(df: pd.DataFrame, columns: list, positions, page_current: int, page_size: int):
+
+    start = page_current * page_size
+    rows = slice(start, start + page_size) if positions is None else positions[start:start + page_size]
+
+    # only the visible rows and columns are taken out of the stored frame
+    page = df.iloc[rows, df.columns.get_indexer(columns)]
+    page.insert(0, get_index_id(df), page.index)
+
+    total = len(df.index) if positions is None else len(positions)
+    return page.to_dict('records'), max(1, -(-total // page_size))
@@ -31,85 +31,177 @@ def get_statistics(series: pd.Series):
 
 # MPT functions
 
-def calculate_risk(covariance_matrix: pd.DataFrame, periods: int, weights: list):
-    weights = np.asarray(weights)
-    return np.sqrt(np.dot(np.dot(weights.T, covariance_matrix * periods), weights))
+def factorize_covariance(covariance_matrix: pd.DataFrame):
+    covariance = np.asarray(covariance_matrix, dtype=float)
+    try:
+        return np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        # short windows give singular matrices, the eigen decomposition still yields a valid factor
+        values, vectors = np.linalg.eigh(covariance)
+        return vectors * np.sqrt(np.clip(values, 0, None))
 
 
-def optimize_risk(covariance_matrix: pd.DataFrame, periods: int):
-    function = lambda weights: calculate_risk(covariance_matrix, periods, weights)
+def calculate_risk(factor: np.ndarray, periods: int, weights: list):
+    # weights may be a single vector or a batch of vectors stacked in rows
+    return np.sqrt(periods) * np.linalg.norm(np.dot(np.asarray(weights), factor), axis=-1)
+
+
+def optimize_risk(factor: np.ndarray, periods: int):
+    function = lambda weights: calculate_risk(factor, periods, weights)
     constraints = ({'type': 'eq', 'fun': lambda weights: np.sum(weights) - 1})
-    bounds = tuple([(0, 1) for _ in range(covariance_matrix.shape[0])])
-    vector = [1 / covariance_matrix.shape[0] for _ in range(covariance_matrix.shape[0])]
+    bounds = tuple([(0, 1) for _ in range(factor.shape[0])])
+    vector = [1 / factor.shape[0] for _ in range(factor.shape[0])]
     return minimize(function, vector, method='SLSQP', bounds=bounds, constraints=constraints).x
 
 
-def calculate_sharpe(returns: pd.Series, covariance_matrix: pd.DataFrame, periods: int, risk_free_rate: float, weights: list):
-    return (np.dot(returns, weights) * periods - risk_free_rate) / calculate_risk(covariance_matrix, periods, weights)
+def calculate_sharpe(returns: pd.Series, factor: np.ndarray, periods: int, risk_free_rate: float, weights: list):
+    return (np.dot(returns, weights) * periods - risk_free_rate) / calculate_risk(factor, periods, weights)
 
 
-def optimize_sharpe(returns: pd.Series, covariance_matrix: pd.DataFrame, periods: int, risk_free_rate: float):
-    function = lambda weights: -calculate_sharpe(returns, covariance_matrix, periods, risk_free_rate, weights)
+def optimize_sharpe(returns: pd.Series, factor: np.ndarray, periods: int, risk_free_rate: float):
+    function = lambda weights: -calculate_sharpe(returns, factor, periods, risk_free_rate, weights)
     constraints = ({'type': 'eq', 'fun': lambda weights: np.sum(weights) - 1})
-    bounds = tuple([(0, 1) for _ in range(covariance_matrix.shape[0])])
-    vector = [1 / covariance_matrix.shape[0] for _ in range(covariance_matrix.shape[0])]
+    bounds = tuple([(0, 1) for _ in range(factor.shape[0])])
+    vector = [1 / factor.shape[0] for _ in range(factor.shape[0])]
     return minimize(function, vector, method='SLSQP', bounds=bounds, constraints=constraints).x
 
 
-def get_results(returns: pd.Series, covariance_matrix: pd.DataFrame, periods: int, risk_free_rate: float, weights: list):
-
-    expected_return = np.dot(returns, weights) * periods
-    risk = calculate_risk(covariance_matrix, periods, weights)
-    sharpe = calculate_sharpe(returns, covariance_matrix, periods, risk_free_rate, weights)
+def run_mpt_calculations(df_est, df_eval, risk_free_rate):
+    return run_mpt_sweep(df_est, df_eval, [risk_free_rate]).drop(columns='risk_free_rate')
 
-    tmp_res_dict = {
-        'ExpReturn': expected_return,
-        'Risk': risk,
-        'Sharpe': sharpe
-    }
 
-    return tmp_res_dict
+# parameter sweep
 
+def run_mpt_sweep(df_est, df_eval, risk_free_rates: list):
 
-def run_mpt_calculations(df_est, df_eval, risk_free_rate):
+    if len(risk_free_rates) == 0:
+        raise ValueError('At least one risk-free rate is required for the sweep.')
 
     eval_periods = len(df_eval.index) + 1
-    eval_returns = df_eval.mean()
-    eval_covariance = df_eval.cov()
+    eval_returns = df_eval.mean().values
+    eval_factor = factorize_covariance(df_eval.cov())
 
     w_naive = [1 / len(df_est.columns) for x in range(len(df_est.columns))]
 
-    list_min_risk = []
-    list_max_eff = []
-    list_naive = []
+    def evaluate(weights):
+        return np.dot(eval_returns, weights) * eval_periods, calculate_risk(eval_factor, eval_periods, weights)
 
-    for days in range(3, len(df_est.index)):
+    days = [x for x in range(3, len(df_est.index))]
+    risk_free_rates = list(dict.fromkeys(risk_free_rates))
+    results = {(strategy, rate): [] for strategy in ['min_risk', 'max_eff', 'naive'] for rate in risk_free_rates}
+    naive_results = evaluate(w_naive)
 
-        est_returns = df_est.iloc[-days:].mean()
-        est_covariance = df_est.iloc[-days:].cov()
+    for window in days:
 
-        w_min_risk = optimize_risk(est_covariance, days)
-        w_max_eff = optimize_sharpe(est_returns, est_covariance, days, risk_free_rate)
+        # window moments, factorization and minimum-risk weights do not depend on the risk-free rate
+        est_returns = df_est.iloc[-window:].mean()
+        est_factor = factorize_covariance(df_est.iloc[-window:].cov())
 
-        list_min_risk.append(get_results(eval_returns, eval_covariance, eval_periods, risk_free_rate, w_min_risk))
-        list_max_eff.append(get_results(eval_returns, eval_covariance, eval_periods, risk_free_rate, w_max_eff))
-        list_naive.append(get_results(eval_returns, eval_covariance, eval_periods, risk_free_rate, w_naive))
+        min_risk_results = evaluate(optimize_risk(est_factor, window))
 
-    df_min_risk = pd.DataFrame(data=list_min_risk, columns=['ExpReturn', 'Risk', 'Sharpe'])
-    df_max_eff = pd.DataFrame(data=list_max_eff, columns=['ExpReturn', 'Risk', 'Sharpe'])
-    df_naive = pd.DataFrame(data=list_naive, columns=['ExpReturn', 'Risk', 'Sharpe'])
+        for risk_free_rate in risk_free_rates:
+            w_max_eff = optimize_sharpe(est_returns, est_factor, window, risk_free_rate)
 
-    df_min_risk['strategy'] = 'min_risk'
-    df_max_eff['strategy'] = 'max_eff'
-    df_naive['strategy'] = 'naive'
+            results[('min_risk', risk_free_rate)].append(min_risk_results)
+            results[('max_eff', risk_free_rate)].append(evaluate(w_max_eff))
+            results[('naive', risk_free_rate)].append(naive_results)
 
-    days = [x for x in range(3, len(df_est.index))]
+    list_df = []
+    for (strategy, risk_free_rate), evaluations in results.items():
+        df_results = pd.DataFrame(data=evaluations, columns=['ExpReturn', 'Risk'])
+        df_results['Sharpe'] = (df_results['ExpReturn'] - risk_free_rate) / df_results['Risk']
+        df_results['strategy'] = strategy
+        df_results['days'] = days
+        df_results['risk_free_rate'] = risk_free_rate
+        list_df.append(df_results)
+
+    return pd.concat(list_df)
+
+
+# Monte Carlo simulation
+
+def generate_portfolios(n_assets: int, n_portfolios: int, chunk_size: int, seed=None):
+    rng = np.random.default_rng(seed)
+    alpha = np.ones(n_assets)
+    for start in range(0, n_portfolios, chunk_size):
+        yield rng.dirichlet(alpha, min(chunk_size, n_portfolios - start))
+
+
+def simulate_portfolios(returns: pd.Series, covariance_matrix: pd.DataFrame, periods: int,
+                        n_portfolios: int = 1000000, chunk_size: int = 50000, bins: int = 100, seed=None):
+
+    mean = np.asarray(returns, dtype=float)
+    covariance = np.asarray(covariance_matrix, dtype=float)
+    n_assets = covariance.shape[0]
+
+    if not (np.isfinite(mean).all() and np.isfinite(covariance).all()):
+        raise ValueError('Returns and covariance matrix must be finite.')
+
+    if n_assets == 1:
+        # a single stock is the only long-only portfolio, there is nothing to sample
+        expected_return, risk = mean[0] * periods, np.sqrt(covariance[0, 0] * periods)
+        return {
+            'frontier': pd.DataFrame({'ExpReturn': [expected_return], 'Risk': [risk]}),
+            'weights': pd.DataFrame(data=[[1.0]], columns=getattr(covariance_matrix, 'columns', None)),
+            'density': pd.DataFrame(data=[[n_portfolios]], index=[expected_return], columns=[risk])
+        }
+
+    factor = factorize_covariance(covariance)
+
+    # long-only portfolios never leave the single-asset extremes, so the grid can be fixed before sampling
+    return_range = [mean.min() * periods, mean.max() * periods]
+    risk_range = [0, np.sqrt(covariance.diagonal().max() * periods)]
+
+    density = np.zeros((bins, bins))
+    return_edges, risk_edges = None, None
+    frontier_return = np.full(bins, np.nan)
+    frontier_risk = np.full(bins, np.inf)
+    frontier_weights = np.full((bins, n_assets), np.nan)
+
+    for weights in generate_portfolios(n_assets, n_portfolios, chunk_size, seed):
+
+        expected_return = np.dot(weights, mean) * periods
+        risk = calculate_risk(factor, periods, weights)
+
+        counts, return_edges, risk_edges = np.histogram2d(expected_return, risk, bins=bins,
+                                                          range=[return_range, risk_range])
+        density += counts
+
+        # keep the least risky portfolio of every return bin seen so far
+        bin_index = np.clip(np.searchsorted(return_edges, expected_return, side='right') - 1, 0, bins - 1)
+        order = np.lexsort((risk, bin_index))
+        first = order[np.r_[True, bin_index[order][1:] != bin_index[order][:-1]]]
+        better = first[risk[first] < frontier_risk[bin_index[first]]]
+        frontier_risk[bin_index[better]] = risk[better]
+        frontier_return[bin_index[better]] = expected_return[better]
+        frontier_weights[bin_index[better]] = weights[better]
+
+    filled = np.isfinite(frontier_risk)
+    df_frontier = pd.DataFrame({
+        'ExpReturn': frontier_return[filled],
+        'Risk': frontier_risk[filled]
+    })
+
+    df_weights = pd.DataFrame(data=frontier_weights[filled], columns=getattr(covariance_matrix, 'columns', None))
+
+    df_density = pd.DataFrame(data=density,
+                              index=(return_edges[:-1] + return_edges[1:]) / 2,
+                              columns=(risk_edges[:-1] + risk_edges[1:]) / 2)
+
+    return {
+        'frontier': df_frontier,
+        'weights': df_weights,
+        'density': df_density
+    }
+
+
+def get_frontier_results(simulation: dict, risk_free_rate: float):
 
-    df_min_risk['days'] = days
-    df_max_eff['days'] = days
-    df_naive['days'] = days
+    # the sampled cloud does not depend on the risk-free rate, only the Sharpe values are recomputed
+    df_frontier = simulation['frontier'].copy()
+    df_frontier['Sharpe'] = (df_frontier['ExpReturn'] - risk_free_rate) / df_frontier['Risk']
 
-    return pd.concat([df_min_risk, df_max_eff, df_naive])
+    return df_frontier, df_frontier['Sharpe'].idxmax()
 
 
 # additional